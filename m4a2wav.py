@@ -1,32 +1,155 @@
 import sys
 import os
+import gc
+import re
+import shutil
+import subprocess
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, 
                                QFileDialog, QLabel, QProgressBar, QListWidget, QHBoxLayout,
                                QSlider, QStyle, QListWidgetItem, QMenu)
-from PySide6.QtCore import Qt, QThread, Signal, QUrl
+from PySide6.QtCore import Qt, QThread, Signal, QUrl, QTimer
 from PySide6.QtGui import QDragEnterEvent, QDropEvent, QColor
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
 from pydub import AudioSegment
 
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+CONVERTED_BATCH_SIZE = 8
+CONVERTED_BATCH_INTERVAL = 0.1  # seconds
+MULTI_INPUT_THRESHOLD = 4  # Above this many files, each ffmpeg process converts several
+MAX_INPUTS_PER_PROCESS = 16
+
 class ConversionThread(QThread):
-    progress = Signal(int)
-    file_converted = Signal(str, str)  # original file, converted file
+    batch_converted = Signal(list)  # [(original file, converted file), ...]
     finished = Signal()
 
     def __init__(self, input_files, output_dir):
         super().__init__()
         self.input_files = input_files
         self.output_dir = output_dir
+        self.ffmpeg_bin = shutil.which("ffmpeg")
+        # Files converted so far, fractional while in flight; the GUI polls it rather than being signalled
+        self.done_files = multiprocessing.Value('d', 0.0)
+        self.file_progress = [0.0] * len(input_files)
+        self.failed_files = []  # Inputs that could not be converted
 
     def run(self):
         total_files = len(self.input_files)
-        for i, input_file in enumerate(self.input_files):
-            output_file = os.path.join(self.output_dir, os.path.splitext(os.path.basename(input_file))[0] + ".wav")
-            audio = AudioSegment.from_file(input_file, format="m4a")
-            audio.export(output_file, format="wav")
-            self.progress.emit(int((i + 1) / total_files * 100))
-            self.file_converted.emit(input_file, output_file)
-        self.finished.emit()
+        # Decoding happens in ffmpeg child processes, so threads are enough to keep every core busy
+        max_workers = max(1, min(total_files, os.cpu_count() or 1))
+        output_files = [os.path.join(self.output_dir, os.path.splitext(os.path.basename(input_file))[0] + ".wav")
+                        for input_file in self.input_files]
+        # Inputs with the same basename map to the same WAV. Each round holds at most one of
+        # them, and rounds run one after another, so the last input still wins as when files
+        # were converted serially, and no output is written by two conversions at once.
+        rounds = []
+        output_uses = {}
+        for job in zip(range(total_files), self.input_files, output_files):
+            use = output_uses.get(job[2], 0)
+            output_uses[job[2]] = use + 1
+            if use == len(rounds):
+                rounds.append([])
+            rounds[use].append(job)
+        # Hand finished files to the GUI in batches so it is not woken once per file
+        converted_pairs = []
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                last_emit = time.monotonic()
+                for jobs in rounds:
+                    if self.ffmpeg_bin and len(jobs) > MULTI_INPUT_THRESHOLD:
+                        # Spread the files over the workers so start-up is paid once per group, not per file
+                        group_size = min(MAX_INPUTS_PER_PROCESS, -(-len(jobs) // max_workers))
+                    else:
+                        group_size = 1
+                    groups = [jobs[i:i + group_size] for i in range(0, len(jobs), group_size)]
+                    groups_by_future = {executor.submit(self._convert_group, group): group for group in groups}
+                    pending = set(groups_by_future)
+                    while pending:
+                        done, pending = wait(pending, timeout=CONVERTED_BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            try:
+                                converted_pairs.extend(future.result())
+                            except Exception:
+                                # Only this group is lost; the rest of the batch carries on
+                                failed_group = groups_by_future[future]
+                                self.failed_files.extend(input_file for _, input_file, _ in failed_group)
+                                self.report_progress([index for index, _, _ in failed_group], 1.0)
+                        if converted_pairs and (len(converted_pairs) >= CONVERTED_BATCH_SIZE or not pending
+                                                or time.monotonic() - last_emit >= CONVERTED_BATCH_INTERVAL):
+                            self.batch_converted.emit(converted_pairs)
+                            converted_pairs = []
+                            last_emit = time.monotonic()
+            if not self.ffmpeg_bin:
+                gc.collect()  # Once per batch, for the buffers and handles pydub leaves behind
+        finally:
+            if converted_pairs:
+                self.batch_converted.emit(converted_pairs)
+            self.finished.emit()
+
+    def _convert_group(self, group):
+        indexes, input_files, output_files = (list(column) for column in zip(*group))
+        converted_pairs = list(zip(input_files, output_files))
+        if self.ffmpeg_bin:
+            try:
+                self.convert_with_ffmpeg(input_files, output_files,
+                                         lambda fraction: self.report_progress(indexes, fraction))
+            except subprocess.CalledProcessError:
+                if len(group) == 1:
+                    raise
+                # One unreadable input fails the whole process; retry the group file by file
+                converted_pairs = []
+                for index, input_file, output_file in zip(indexes, input_files, output_files):
+                    try:
+                        self.convert_with_ffmpeg([input_file], [output_file],
+                                                 lambda fraction, index=index: self.report_progress([index], fraction))
+                    except subprocess.CalledProcessError:
+                        self.failed_files.append(input_file)
+                    else:
+                        converted_pairs.append((input_file, output_file))
+        else:
+            for input_file, output_file in zip(input_files, output_files):
+                # No ffmpeg on PATH; let pydub use whatever converter it is configured with
+                audio = AudioSegment.from_file(input_file, format="m4a")
+                audio.export(output_file, format="wav")
+                # Release this file's PCM before the worker decodes its next file, so each worker
+                # holds at most one decoded file
+                del audio
+        self.report_progress(indexes, 1.0)
+        return converted_pairs
+
+    def report_progress(self, indexes, fraction):
+        # Called from worker threads
+        with self.done_files.get_lock():
+            for index in indexes:
+                self.done_files.value += fraction - self.file_progress[index]
+                self.file_progress[index] = fraction
+
+    def convert_with_ffmpeg(self, input_files, output_files, report_progress):
+        # ffmpeg streams AAC -> PCM -> WAV itself; stderr is merged into the -progress
+        # stream so the input duration and out_time_ms can be read from a single pipe.
+        # Several inputs share one process, each mapped to its own output file.
+        cmd = [self.ffmpeg_bin, "-y", "-hide_banner", "-nostats", "-progress", "pipe:1"]
+        for input_file in input_files:
+            cmd += ["-i", input_file]
+        for i, output_file in enumerate(output_files):
+            cmd += ["-map", f"{i}:a:0", "-acodec", "pcm_s16le", "-f", "wav", output_file]
+        duration_us = 0
+        with subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True, errors="replace") as proc:
+            for line in proc.stdout:
+                line = line.strip()
+                match = DURATION_RE.search(line)
+                if match:
+                    hours, minutes, seconds = match.groups()
+                    duration_us = max(duration_us, int((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1e6))
+                elif line.startswith("out_time_ms=") and duration_us:
+                    out_time = line.partition("=")[2]
+                    if out_time.isdigit():  # "N/A" until the first packet is written
+                        report_progress(min(int(out_time) / duration_us, 1.0))
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -66,6 +189,9 @@ class MainWindow(QMainWindow):
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
         layout.addWidget(self.progress_bar)
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(100)  # Poll conversion progress at 10 Hz
+        self.progress_timer.timeout.connect(self.update_progress)
 
         self.status_label = QLabel("Ready")
         layout.addWidget(self.status_label)
@@ -86,9 +212,11 @@ class MainWindow(QMainWindow):
         self.preview_label = QLabel("No file selected for preview")
         layout.addWidget(self.preview_label)
 
-        self.input_files = []
+        self.input_files = {}  # Used as an insertion-ordered set of paths
         self.output_dir = ""
         self.converted_files = {}  # Dictionary to store original:converted file pairs
+        self._item_by_path = {}  # File path -> its QListWidgetItem in file_list
+        self.last_converted_file = None
 
         # Set up media player
         self.media_player = QMediaPlayer()
@@ -96,6 +224,8 @@ class MainWindow(QMainWindow):
         self.media_player.setAudioOutput(self.audio_output)
         self.media_player.positionChanged.connect(self.position_changed)
         self.media_player.durationChanged.connect(self.duration_changed)
+        self._pending_media = None  # File to preview; handed to the player on the next play
+        self._loaded_media = None  # File currently set as the player's source
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
@@ -109,13 +239,16 @@ class MainWindow(QMainWindow):
                 new_files.append(file_path)
                 self.add_file_to_list(file_path)
         if new_files and self.output_dir:
-            self.input_files.extend(new_files)
+            self.input_files.update(dict.fromkeys(new_files))
             self.start_conversion(new_files)
 
     def add_file_to_list(self, file_path):
+        if file_path in self._item_by_path:
+            return  # Already listed; dropping a file again only reconverts it
         item = QListWidgetItem(os.path.basename(file_path))
         item.setData(Qt.ItemDataRole.UserRole, file_path)
         self.file_list.addItem(item)
+        self._item_by_path[file_path] = item
 
     def select_files(self):
         file_dialog = QFileDialog(self)
@@ -123,7 +256,7 @@ class MainWindow(QMainWindow):
         if files:
             for file in files:
                 if file not in self.input_files:
-                    self.input_files.append(file)
+                    self.input_files[file] = None
                     self.add_file_to_list(file)
             if self.output_dir:
                 self.start_conversion(files)
@@ -138,47 +271,79 @@ class MainWindow(QMainWindow):
         self.select_button.setEnabled(False)
         self.output_dir_button.setEnabled(False)
         self.status_label.setText("Converting...")
+        self.last_converted_file = None
         self.progress_bar.setValue(0)
 
         self.conversion_thread = ConversionThread(files, self.output_dir)
-        self.conversion_thread.progress.connect(self.update_progress)
-        self.conversion_thread.file_converted.connect(self.file_converted)
+        self.conversion_thread.batch_converted.connect(self.files_converted)
         self.conversion_thread.finished.connect(self.conversion_finished)
         self.conversion_thread.start()
+        self.progress_timer.start()
 
-    def update_progress(self, value):
-        self.progress_bar.setValue(value)
+    def update_progress(self):
+        done_files = self.conversion_thread.done_files.value
+        self.progress_bar.setValue(int(done_files / len(self.conversion_thread.input_files) * 100))
 
-    def file_converted(self, original_file, converted_file):
-        self.converted_files[original_file] = converted_file
-        self.update_file_list_item(original_file)
-        self.preview_label.setText(f"Preview: {os.path.basename(converted_file)}")
-        self.load_media(converted_file)
+    def files_converted(self, converted_pairs):
+        for original_file, converted_file in converted_pairs:
+            self.converted_files[original_file] = converted_file
+            self.update_file_list_item(original_file)
+        self.last_converted_file = converted_pairs[-1][1]
 
     def update_file_list_item(self, file_path):
-        for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == file_path:
-                item.setBackground(QColor(200, 255, 200))  # Light green background
-                item.setText(f"{os.path.basename(file_path)} (Converted)")
-                break
+        item = self._item_by_path.get(file_path)
+        if item is not None:
+            item.setBackground(QColor(200, 255, 200))  # Light green background
+            item.setText(f"{os.path.basename(file_path)} (Converted)")
 
     def conversion_finished(self):
+        self.progress_timer.stop()
         self.progress_bar.setValue(100)
-        self.status_label.setText("Conversion complete!")
+        failed_files = self.conversion_thread.failed_files
+        for file_path in failed_files:
+            item = self._item_by_path.get(file_path)
+            if item is not None:
+                item.setText(f"{os.path.basename(file_path)} (Failed)")
+        if failed_files:
+            self.status_label.setText(f"Conversion complete, {len(failed_files)} file(s) failed")
+        else:
+            self.status_label.setText("Conversion complete!")
         self.select_button.setEnabled(True)
         self.output_dir_button.setEnabled(True)
+        # Preview only the last file of the batch; earlier ones load when clicked
+        if self.last_converted_file:
+            self.preview_label.setText(f"Preview: {os.path.basename(self.last_converted_file)}")
+            self.load_media(self.last_converted_file)
 
     def load_media(self, file_path):
-        self.media_player.setSource(QUrl.fromLocalFile(file_path))
+        # setSource rebuilds the backend pipeline, so it waits until the user presses play
+        self._pending_media = file_path
+        if self._loaded_media != file_path:
+            if self.media_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
+                self.media_player.stop()
+            # The player still holds the previous file; seeking it would be lost on the next play
+            self.position_slider.setRange(0, 0)
+            self.position_slider.setEnabled(False)
+        else:
+            # Back to the file the player already holds
+            self.position_slider.setRange(0, self.media_player.duration())
+            self.position_slider.setEnabled(True)
         self.play_button.setEnabled(True)
 
     def toggle_playback(self):
         if self.media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.media_player.pause()
         else:
+            self._ensure_media_loaded()
             self.media_player.play()
 
+    def _ensure_media_loaded(self):
+        if self._pending_media is not None and self._pending_media != self._loaded_media:
+            self.media_player.stop()  # Let the old pipeline tear down before switching
+            self.media_player.setSource(QUrl.fromLocalFile(self._pending_media))
+            self._loaded_media = self._pending_media
+            self.position_slider.setEnabled(True)  # durationChanged sets the new range
+
     def set_position(self, position):
         self.media_player.setPosition(position)
 
@@ -199,8 +364,9 @@ class MainWindow(QMainWindow):
         current_item = self.file_list.currentItem()
         if current_item:
             file_path = current_item.data(Qt.ItemDataRole.UserRole)
-            self.input_files.remove(file_path)
+            self.input_files.pop(file_path, None)
             self.file_list.takeItem(self.file_list.row(current_item))
+            self._item_by_path.pop(file_path, None)
             if file_path in self.converted_files:
                 del self.converted_files[file_path]
 
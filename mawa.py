@@ -1,5 +1,13 @@
 import sys
 import os
+import gc
+import re
+import shutil
+import subprocess
+import multiprocessing
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, 
                                QFileDialog, QLabel, QProgressBar, QListWidget, QHBoxLayout,
@@ -7,52 +15,241 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PySide6.QtCore import Qt, QThread, Signal, QUrl, QTimer
 from PySide6.QtGui import QDragEnterEvent, QDropEvent, QColor, QBrush, QPainter, QLinearGradient, QFont, QPen
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PySide6.QtWebEngineWidgets import QWebEngineView
 from pydub import AudioSegment
 import pyqtgraph as pg
 import soundfile as sf
-from bokeh.plotting import figure
-from bokeh.resources import CDN
-from bokeh.embed import file_html
-from bokeh.models import HoverTool, BoxZoomTool, ResetTool, PanTool, WheelZoomTool
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the envelope falls back to NumPy reductions
+    njit = None
+
+pg.setConfigOptions(useOpenGL=True, antialias=False)
+
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+CONVERTED_BATCH_SIZE = 8
+CONVERTED_BATCH_INTERVAL = 0.1  # seconds
+MULTI_INPUT_THRESHOLD = 4  # Above this many files, each ffmpeg process converts several
+MAX_INPUTS_PER_PROCESS = 16
+PCM_FORMATS = {2: (np.int16, 'PCM_16'), 4: (np.int32, 'PCM_32')}  # pydub sample width -> (dtype, WAV subtype)
+VISUALIZATION_FRAMES = 1000
+VISUALIZATION_STRIDE = 5  # Plot every 5th frame of the real-time window
+OPEN_SOUND_FILES = 4  # Preview handles kept open for re-clicks
+WAVEFORM_BINS = 800  # One min/max pair per horizontal pixel of the waveform plot
+WAVEFORM_BLOCK_FRAMES = 65536
+
+if njit is not None:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _peaks(samples, bin_size, out_min, out_max):
+        # Min and max of each bin in a single pass over the samples
+        n_samples = samples.shape[0]
+        for b in prange(out_min.shape[0]):
+            start = b * bin_size
+            end = min(start + bin_size, n_samples)
+            lo = hi = samples[start]
+            for i in range(start + 1, end):
+                v = samples[i]
+                if v < lo:
+                    lo = v
+                elif v > hi:
+                    hi = v
+            out_min[b] = lo
+            out_max[b] = hi
+else:
+    def _peaks(samples, bin_size, out_min, out_max):
+        starts = np.arange(0, samples.shape[0], bin_size)
+        np.minimum.reduceat(samples, starts, out=out_min)
+        np.maximum.reduceat(samples, starts, out=out_max)
+
+def waveform_envelope(file_path, bins=WAVEFORM_BINS):
+    # Stream the file in blocks and reduce it to one (min, max) pair per bin
+    with sf.SoundFile(file_path) as f:
+        sample_rate = f.samplerate
+        bin_size = max(1, -(-f.frames // bins))
+        n_bins = -(-f.frames // bin_size)
+        mins = np.empty(n_bins, dtype=np.float32)
+        maxs = np.empty(n_bins, dtype=np.float32)
+        # Whole bins per block, so no bin straddles two reads
+        blocksize = bin_size * max(1, WAVEFORM_BLOCK_FRAMES // bin_size)
+        # libsndfile decodes each block straight into this one float32 buffer
+        block_buf = np.empty((blocksize, f.channels), dtype=np.float32)
+        filled = 0
+        for block in f.blocks(out=block_buf):
+            # Frames are interleaved, so a bin of bin_size frames is bin_size * channels samples
+            samples = block.ravel()
+            block_bins = -(-len(block) // bin_size)
+            _peaks(samples, bin_size * f.channels, mins[filled:filled + block_bins], maxs[filled:filled + block_bins])
+            filled += block_bins
+    times = np.arange(filled, dtype=np.float32) * np.float32(bin_size / sample_rate)
+    return times, mins[:filled], maxs[:filled]
+
+@lru_cache(maxsize=4)
+def _envelope_cached(path, mtime):
+    # mtime is part of the key so a reconverted file is reduced again
+    return waveform_envelope(path)
+
+def cached_envelope(path):
+    return _envelope_cached(path, os.path.getmtime(path))
 
 class ConversionThread(QThread):
-    progress = Signal(int)
-    file_converted = Signal(str, str)  # original file, converted file
+    batch_converted = Signal(list)  # [(original file, converted file), ...]
     finished = Signal()
 
     def __init__(self, input_files, output_dir):
         super().__init__()
         self.input_files = input_files
         self.output_dir = output_dir
+        self.ffmpeg_bin = shutil.which("ffmpeg")
+        # Files converted so far, fractional while in flight; the GUI polls it rather than being signalled
+        self.done_files = multiprocessing.Value('d', 0.0)
+        self.file_progress = [0.0] * len(input_files)
+        self.failed_files = []  # Inputs that could not be converted
 
     def run(self):
         total_files = len(self.input_files)
-        for i, input_file in enumerate(self.input_files):
-            output_file = os.path.join(self.output_dir, os.path.splitext(os.path.basename(input_file))[0] + ".wav")
-            audio = AudioSegment.from_file(input_file, format="m4a")
-            audio.export(output_file, format="wav")
-            self.progress.emit(int((i + 1) / total_files * 100))
-            self.file_converted.emit(input_file, output_file)
-        self.finished.emit()
+        # Decoding happens in ffmpeg child processes, so threads are enough to keep every core busy
+        max_workers = max(1, min(total_files, os.cpu_count() or 1))
+        output_files = [os.path.join(self.output_dir, os.path.splitext(os.path.basename(input_file))[0] + ".wav")
+                        for input_file in self.input_files]
+        # Inputs with the same basename map to the same WAV. Each round holds at most one of
+        # them, and rounds run one after another, so the last input still wins as when files
+        # were converted serially, and no output is written by two conversions at once.
+        rounds = []
+        output_uses = {}
+        for job in zip(range(total_files), self.input_files, output_files):
+            use = output_uses.get(job[2], 0)
+            output_uses[job[2]] = use + 1
+            if use == len(rounds):
+                rounds.append([])
+            rounds[use].append(job)
+        # Hand finished files to the GUI in batches so it is not woken once per file
+        converted_pairs = []
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                last_emit = time.monotonic()
+                for jobs in rounds:
+                    if self.ffmpeg_bin and len(jobs) > MULTI_INPUT_THRESHOLD:
+                        # Spread the files over the workers so start-up is paid once per group, not per file
+                        group_size = min(MAX_INPUTS_PER_PROCESS, -(-len(jobs) // max_workers))
+                    else:
+                        group_size = 1
+                    groups = [jobs[i:i + group_size] for i in range(0, len(jobs), group_size)]
+                    groups_by_future = {executor.submit(self._convert_group, group): group for group in groups}
+                    pending = set(groups_by_future)
+                    while pending:
+                        done, pending = wait(pending, timeout=CONVERTED_BATCH_INTERVAL, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            try:
+                                converted_pairs.extend(future.result())
+                            except Exception:
+                                # Only this group is lost; the rest of the batch carries on
+                                failed_group = groups_by_future[future]
+                                self.failed_files.extend(input_file for _, input_file, _ in failed_group)
+                                self.report_progress([index for index, _, _ in failed_group], 1.0)
+                        if converted_pairs and (len(converted_pairs) >= CONVERTED_BATCH_SIZE or not pending
+                                                or time.monotonic() - last_emit >= CONVERTED_BATCH_INTERVAL):
+                            self.batch_converted.emit(converted_pairs)
+                            converted_pairs = []
+                            last_emit = time.monotonic()
+            if not self.ffmpeg_bin:
+                gc.collect()  # Once per batch, for the buffers and handles pydub leaves behind
+        finally:
+            if converted_pairs:
+                self.batch_converted.emit(converted_pairs)
+            self.finished.emit()
+
+    def _convert_group(self, group):
+        indexes, input_files, output_files = (list(column) for column in zip(*group))
+        converted_pairs = list(zip(input_files, output_files))
+        if self.ffmpeg_bin:
+            try:
+                self.convert_with_ffmpeg(input_files, output_files,
+                                         lambda fraction: self.report_progress(indexes, fraction))
+            except subprocess.CalledProcessError:
+                if len(group) == 1:
+                    raise
+                # One unreadable input fails the whole process; retry the group file by file
+                converted_pairs = []
+                for index, input_file, output_file in zip(indexes, input_files, output_files):
+                    try:
+                        self.convert_with_ffmpeg([input_file], [output_file],
+                                                 lambda fraction, index=index: self.report_progress([index], fraction))
+                    except subprocess.CalledProcessError:
+                        self.failed_files.append(input_file)
+                    else:
+                        converted_pairs.append((input_file, output_file))
+        else:
+            for input_file, output_file in zip(input_files, output_files):
+                # No ffmpeg on PATH; let pydub use whatever converter it is configured with
+                audio = AudioSegment.from_file(input_file, format="m4a")
+                if audio.sample_width in PCM_FORMATS:
+                    # libsndfile writes the decoded PCM in place, without pydub's export copies
+                    dtype, subtype = PCM_FORMATS[audio.sample_width]
+                    samples = np.frombuffer(audio.raw_data, dtype=dtype).reshape(-1, audio.channels)
+                    sf.write(output_file, samples, audio.frame_rate, subtype=subtype)
+                    del samples
+                else:
+                    audio.export(output_file, format="wav")
+                # Release this file's PCM before the worker decodes its next file, so each worker
+                # holds at most one decoded file
+                del audio
+        self.report_progress(indexes, 1.0)
+        return converted_pairs
+
+    def report_progress(self, indexes, fraction):
+        # Called from worker threads
+        with self.done_files.get_lock():
+            for index in indexes:
+                self.done_files.value += fraction - self.file_progress[index]
+                self.file_progress[index] = fraction
+
+    def convert_with_ffmpeg(self, input_files, output_files, report_progress):
+        # ffmpeg streams AAC -> PCM -> WAV itself; stderr is merged into the -progress
+        # stream so the input duration and out_time_ms can be read from a single pipe.
+        # Several inputs share one process, each mapped to its own output file.
+        cmd = [self.ffmpeg_bin, "-y", "-hide_banner", "-nostats", "-progress", "pipe:1"]
+        for input_file in input_files:
+            cmd += ["-i", input_file]
+        for i, output_file in enumerate(output_files):
+            cmd += ["-map", f"{i}:a:0", "-acodec", "pcm_s16le", "-f", "wav", output_file]
+        duration_us = 0
+        with subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True, errors="replace") as proc:
+            for line in proc.stdout:
+                line = line.strip()
+                match = DURATION_RE.search(line)
+                if match:
+                    hours, minutes, seconds = match.groups()
+                    duration_us = max(duration_us, int((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1e6))
+                elif line.startswith("out_time_ms=") and duration_us:
+                    out_time = line.partition("=")[2]
+                    if out_time.isdigit():  # "N/A" until the first packet is written
+                        report_progress(min(int(out_time) / duration_us, 1.0))
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
 
 class GradientItemDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Built once; paint only moves the gradient to the row being drawn
+        self._font = QFont("Arial", 10)
+        self._gradient = QLinearGradient(0, 0, 1, 0)
+        self._gradient.setColorAt(0.0, QColor("#78FFD6"))
+        self._gradient.setColorAt(1.0, QColor("#007991"))
+        self._pen = QPen(self._gradient, 1)
+
     def paint(self, painter, option, index):
         if index.data(Qt.ItemDataRole.UserRole + 1):  # Check if it's a converted file
             painter.save()
             painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setFont(self._font)
 
-            # Set up the font
-            font = QFont("Arial", 10)
-            painter.setFont(font)
+            # Stretch the gradient across this row
+            self._gradient.setStart(option.rect.topLeft())
+            self._gradient.setFinalStop(option.rect.topRight())
+            self._pen.setBrush(self._gradient)
 
-            # Create the gradient
-            gradient = QLinearGradient(option.rect.topLeft(), option.rect.topRight())
-            gradient.setColorAt(0.0, QColor("#78FFD6"))
-            gradient.setColorAt(1.0, QColor("#007991"))
-            
             # Draw the text
-            painter.setPen(QPen(gradient, 1))
+            painter.setPen(self._pen)
             painter.drawText(option.rect, Qt.AlignmentFlag.AlignVCenter, "  " + index.data())
 
             painter.restore()
@@ -98,13 +295,21 @@ class MainWindow(QMainWindow):
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
         layout.addWidget(self.progress_bar)
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(100)  # Poll conversion progress at 10 Hz
+        self.progress_timer.timeout.connect(self.update_progress)
 
         self.status_label = QLabel("Ready")
         layout.addWidget(self.status_label)
 
-        # Bokeh waveform visualization
-        self.web_view = QWebEngineView()
-        layout.addWidget(self.web_view)
+        # Waveform visualization
+        self.waveform_plot = pg.PlotWidget(title="Audio Waveform")
+        self.waveform_plot.setLabel('bottom', "Time", units='s')
+        self.waveform_plot.setLabel('left', "Amplitude")
+        self.waveform_plot.showGrid(x=True, y=True, alpha=0.3)
+        self.waveform_min_curve = self.waveform_plot.plot(pen='#78FFD6')
+        self.waveform_max_curve = self.waveform_plot.plot(pen='#007991')
+        layout.addWidget(self.waveform_plot)
 
 
         # Audio preview area
@@ -123,9 +328,11 @@ class MainWindow(QMainWindow):
         self.preview_label = QLabel("No file selected for preview")
         layout.addWidget(self.preview_label)
 
-        self.input_files = []
+        self.input_files = {}  # Used as an insertion-ordered set of paths
         self.output_dir = ""
         self.converted_files = {}  # Dictionary to store original:converted file pairs
+        self._item_by_path = {}  # File path -> its QListWidgetItem in file_list
+        self.last_converted_file = None
 
         # Set up media player
         self.media_player = QMediaPlayer()
@@ -133,18 +340,23 @@ class MainWindow(QMainWindow):
         self.media_player.setAudioOutput(self.audio_output)
         self.media_player.positionChanged.connect(self.position_changed)
         self.media_player.durationChanged.connect(self.duration_changed)
+        self._pending_media = None  # File to preview; handed to the player on the next play
+        self._loaded_media = None  # File currently set as the player's source
+
+        self.current_sf = None
+        self._sound_files = {}  # (path, mtime) -> open SoundFile, least recently used first
+        # Reused by every update_visualization call instead of allocating per tick
+        self._read_buf = np.empty((VISUALIZATION_FRAMES, 1), dtype=np.float32)
+        self._vis_buf = np.empty(VISUALIZATION_FRAMES, dtype=np.float32)
+        self._vis_x = np.arange(VISUALIZATION_FRAMES, dtype=np.float32)
 
-        self.current_audio_data = None
-        self.current_audio_pos = 0
+        # Compile the waveform kernel now rather than on the first converted file
+        _peaks(np.zeros(2, dtype=np.float32), 1, np.empty(2, dtype=np.float32), np.empty(2, dtype=np.float32))
 
          # Real-time audio visualization
         self.audio_plot = pg.PlotWidget()
         self.audio_curve = self.audio_plot.plot(pen='#77ff88')
         layout.addWidget(self.audio_plot)
-               # Timer for updating real-time visualization
-        self.visualization_timer = QTimer()
-        self.visualization_timer.timeout.connect(self.update_visualization)
-        self.visualization_timer.start(50)  # Update every 50 ms
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
@@ -158,14 +370,17 @@ class MainWindow(QMainWindow):
                 new_files.append(file_path)
                 self.add_file_to_list(file_path)
         if new_files and self.output_dir:
-            self.input_files.extend(new_files)
+            self.input_files.update(dict.fromkeys(new_files))
             self.start_conversion(new_files)
 
     def add_file_to_list(self, file_path):
+        if file_path in self._item_by_path:
+            return  # Already listed; dropping a file again only reconverts it
         item = QListWidgetItem(os.path.basename(file_path))
         item.setData(Qt.ItemDataRole.UserRole, file_path)
         item.setData(Qt.ItemDataRole.UserRole + 1, False)  # Not converted yet
         self.file_list.addItem(item)
+        self._item_by_path[file_path] = item
 
     def select_files(self):
         file_dialog = QFileDialog(self)
@@ -173,7 +388,7 @@ class MainWindow(QMainWindow):
         if files:
             for file in files:
                 if file not in self.input_files:
-                    self.input_files.append(file)
+                    self.input_files[file] = None
                     self.add_file_to_list(file)
             if self.output_dir:
                 self.start_conversion(files)
@@ -188,57 +403,88 @@ class MainWindow(QMainWindow):
         self.select_button.setEnabled(False)
         self.output_dir_button.setEnabled(False)
         self.status_label.setText("Converting...")
+        self.last_converted_file = None
         self.progress_bar.setValue(0)
 
         self.conversion_thread = ConversionThread(files, self.output_dir)
-        self.conversion_thread.progress.connect(self.update_progress)
-        self.conversion_thread.file_converted.connect(self.file_converted)
+        self.conversion_thread.batch_converted.connect(self.files_converted)
         self.conversion_thread.finished.connect(self.conversion_finished)
         self.conversion_thread.start()
+        self.progress_timer.start()
 
-    def update_progress(self, value):
-        self.progress_bar.setValue(value)
+    def update_progress(self):
+        done_files = self.conversion_thread.done_files.value
+        self.progress_bar.setValue(int(done_files / len(self.conversion_thread.input_files) * 100))
 
-    def file_converted(self, original_file, converted_file):
-        self.converted_files[original_file] = converted_file
-        self.update_file_list_item(original_file)
-        self.preview_label.setText(f"Preview: {os.path.basename(converted_file)}")
-        self.load_media(converted_file)
-        self.display_waveform(converted_file)
+    def files_converted(self, converted_pairs):
+        for original_file, converted_file in converted_pairs:
+            self.converted_files[original_file] = converted_file
+            self.update_file_list_item(original_file)
+        self.file_list.repaint()
+        self.last_converted_file = converted_pairs[-1][1]
 
     def update_file_list_item(self, file_path):
-        for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == file_path:
-                item.setData(Qt.ItemDataRole.UserRole + 1, True)  # Mark as converted
-                item.setText(f"{os.path.basename(file_path)} (Converted)")
-                self.file_list.repaint()
-                break
+        item = self._item_by_path.get(file_path)
+        if item is not None:
+            item.setData(Qt.ItemDataRole.UserRole + 1, True)  # Mark as converted
+            item.setText(f"{os.path.basename(file_path)} (Converted)")
 
     def conversion_finished(self):
+        self.progress_timer.stop()
         self.progress_bar.setValue(100)
-        self.status_label.setText("Conversion complete!")
+        failed_files = self.conversion_thread.failed_files
+        for file_path in failed_files:
+            item = self._item_by_path.get(file_path)
+            if item is not None:
+                item.setText(f"{os.path.basename(file_path)} (Failed)")
+        if failed_files:
+            self.status_label.setText(f"Conversion complete, {len(failed_files)} file(s) failed")
+        else:
+            self.status_label.setText("Conversion complete!")
         self.select_button.setEnabled(True)
         self.output_dir_button.setEnabled(True)
+        # Preview only the last file of the batch; earlier ones load when clicked
+        if self.last_converted_file:
+            self.preview_label.setText(f"Preview: {os.path.basename(self.last_converted_file)}")
+            self.load_media(self.last_converted_file)
+            self.display_waveform(self.last_converted_file)
 
     def load_media(self, file_path):
-        self.media_player.setSource(QUrl.fromLocalFile(file_path))
-        self.play_button.setEnabled(True)
-        self.current_audio_data, _ = sf.read(file_path)
-        self.current_audio_pos = 0
-
-    def toggle_playback(self):
-        if self.media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-            self.media_player.pause()
+        # setSource rebuilds the backend pipeline, so it waits until the user presses play
+        self._pending_media = file_path
+        if self._loaded_media != file_path:
+            if self.media_player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
+                self.media_player.stop()
+                self.play_button.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
+            # The player still holds the previous file; seeking it would be lost on the next play
+            self.position_slider.setRange(0, 0)
+            self.position_slider.setEnabled(False)
         else:
-            self.media_player.play()
+            # Back to the file the player already holds
+            self.position_slider.setRange(0, self.media_player.duration())
+            self.position_slider.setEnabled(True)
+        self.play_button.setEnabled(True)
+        # Only the header is parsed here; update_visualization reads the window being played
+        self.current_sf = self.open_sound_file(file_path)
+        if self._read_buf.shape[1] != self.current_sf.channels:
+            self._read_buf = np.empty((VISUALIZATION_FRAMES, self.current_sf.channels), dtype=np.float32)
+
+    def _ensure_media_loaded(self):
+        if self._pending_media is not None and self._pending_media != self._loaded_media:
+            self.media_player.stop()  # Let the old pipeline tear down before switching
+            self.media_player.setSource(QUrl.fromLocalFile(self._pending_media))
+            self._loaded_media = self._pending_media
+            self.position_slider.setEnabled(True)  # durationChanged sets the new range
 
     def set_position(self, position):
         self.media_player.setPosition(position)
 
     def position_changed(self, position):
         self.position_slider.setValue(position)
-        self.current_audio_pos = int(position / 1000 * 44100)  # Assuming 44.1kHz sample rate
+        # The player reports its position at audio output cadence, which paces the real-time plot.
+        # Until the pending file is handed to the player, that position belongs to the previous file.
+        if self._pending_media == self._loaded_media:
+            self.update_visualization()
 
     def duration_changed(self, duration):
         self.position_slider.setRange(0, duration)
@@ -257,9 +503,9 @@ class MainWindow(QMainWindow):
         current_item = self.file_list.currentItem()
         if current_item:
             file_path = current_item.data(Qt.ItemDataRole.UserRole)
-            if file_path in self.input_files:
-                self.input_files.remove(file_path)
+            self.input_files.pop(file_path, None)
             self.file_list.takeItem(self.file_list.row(current_item))
+            self._item_by_path.pop(file_path, None)
             if file_path in self.converted_files:
                 del self.converted_files[file_path]
 
@@ -279,55 +525,43 @@ class MainWindow(QMainWindow):
             self.display_waveform(converted_file)
 
     def display_waveform(self, file_path):
-        audio_data, sample_rate = sf.read(file_path)
-        time = np.arange(0, len(audio_data)) / sample_rate
-
-        p = figure(title="Audio Waveform", x_axis_label="Time (s)", y_axis_label="Amplitude",
-                tools="pan,box_zoom,wheel_zoom,reset,hover",
-                active_drag="pan",
-                active_scroll="wheel_zoom",
-                width=800, height=300)
-
-        # Add the waveform
-        gradient = ["#78FFD6", "#007991"]  # Start and end colors of the gradient
-        p.line(time, audio_data, line_color="#78FFD6", line_alpha=0.8)
-
-        # Customize the plot
-        p.background_fill_color = "#f0f0f0"  # Light gray background
-        p.border_fill_color = None
-        p.outline_line_color = None
-        p.grid.grid_line_color = "#e0e0e0"  # Lighter gray for grid lines
-        p.axis.axis_line_color = '#007991'
-        p.axis.major_tick_line_color = '#007991'
-        p.axis.axis_label_text_color = '#007991'
-        p.axis.major_label_text_color = '#007991'
-        p.title.text_color = '#007991'
-
-        # Add hover tool
-        hover = p.select_one(HoverTool)
-        hover.tooltips = [("Time", "@x{0.000}s"), ("Amplitude", "@y")]
-        hover.mode = 'vline'
-
-        # Create the HTML
-        html = file_html(p, CDN, "Audio Waveform")
-        self.web_view.setHtml(html)
-        self.web_view.show()
+        times, mins, maxs = cached_envelope(file_path)
+        self.waveform_min_curve.setData(times, mins)
+        self.waveform_max_curve.setData(times, maxs)
+
+    def open_sound_file(self, file_path):
+        # Reuse the handle when the user clicks back to a recently previewed file
+        key = (file_path, os.path.getmtime(file_path))
+        sound_file = self._sound_files.pop(key, None)
+        if sound_file is None:
+            sound_file = sf.SoundFile(file_path)
+        self._sound_files[key] = sound_file
+        while len(self._sound_files) > OPEN_SOUND_FILES:
+            self._sound_files.pop(next(iter(self._sound_files))).close()
+        return sound_file
 
     def update_visualization(self):
-        if self.current_audio_data is not None and self.media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-            chunk_size = 1000
-            end_pos = min(self.current_audio_pos + chunk_size, len(self.current_audio_data))
-            chunk = self.current_audio_data[self.current_audio_pos:end_pos]
-            self.audio_curve.setData(chunk)
-            self.current_audio_pos = end_pos
-            if self.current_audio_pos >= len(self.current_audio_data):
-                self.current_audio_pos = 0
+        if self.current_sf is not None:
+            pos_frames = int(self.media_player.position() / 1000 * self.current_sf.samplerate)
+            if pos_frames < self.current_sf.frames:
+                self.current_sf.seek(pos_frames)
+                chunk = self.current_sf.read(out=self._read_buf)
+                n = len(chunk)
+                np.mean(chunk, axis=1, out=self._vis_buf[:n])  # Mix down to mono
+                self.audio_curve.setData(self._vis_x[:n:VISUALIZATION_STRIDE],
+                                         self._vis_buf[:n:VISUALIZATION_STRIDE], connect='finite')
+
+    def closeEvent(self, event):
+        for sound_file in self._sound_files.values():
+            sound_file.close()
+        super().closeEvent(event)
 
     def toggle_playback(self):
         if self.media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.media_player.pause()
             self.play_button.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
         else:
+            self._ensure_media_loaded()
             self.media_player.play()
             self.play_button.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPause))
 